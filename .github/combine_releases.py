@@ -1,16 +1,39 @@
 #!/usr/bin/env python3
 import requests
+import hashlib
 import json
 import os
+import random
 import re
 import sys
+import threading
 import traceback
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from packaging import version  # For proper semver comparison
 import time
 from datetime import datetime
 
-output_path = 'core/resources/quickpick-releases.json'
+output_path = os.environ.get('QUICKPICK_OUTPUT', 'core/resources/quickpick-releases.json')
+# Digests of the combined file and of each module, so clients can tell what changed
+manifest_path = os.path.join(os.path.dirname(output_path), 'quickpick-manifest.json')
+MANIFEST_FORMAT = 1
+# With QUICKPICK_SHARDS=1, each module is also written to its own file here
+shards_dir = os.path.join(os.path.dirname(output_path), 'quickpick')
+write_shards = os.environ.get('QUICKPICK_SHARDS') == '1'
+
+# Base URLs of the GitHub API and of raw file downloads. GITHUB_API_URL is set by
+# GitHub Actions; both can point to a local server to run the script offline.
+api_base_url = os.environ.get('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+raw_base_url = os.environ.get('GITHUB_RAW_URL', 'https://raw.githubusercontent.com').rstrip('/')
+
+# Responses are kept here between runs with their ETag/Last-Modified validators
+http_cache_dir = os.environ.get('QUICKPICK_HTTP_CACHE', '.cache/quickpick-http')
+# Bumped when the data cached for a URL changes shape
+HTTP_CACHE_FORMAT = 2
+# With QUICKPICK_OFFLINE=1, responses are only read from the cache, which then
+# serves as recorded fixtures: record them with a normal run into an empty
+# QUICKPICK_HTTP_CACHE directory
+offline = os.environ.get('QUICKPICK_OFFLINE') == '1'
 
 # GitHub repositories to fetch releases from
 repos = [
@@ -51,38 +74,272 @@ headers = {}
 # Use GitHub token if available in environment variables
 if os.environ.get('GH_PAT'):
     headers = {"Authorization": f"token {os.environ.get('GH_PAT')}"}
-    print("Using GitHub PAT for authentication")
-else:
-    print("No GitHub PAT found, using unauthenticated requests")
 
 # Shared session so HTTP connections (TLS/TCP) are reused across requests
 http_session = requests.Session()
 
 # Per-repo caches, populated once and reused by both the main loop and the
 # validation pass so nothing is fetched more than once per run
-releases_props_cache = {}  # repo -> [(version, url)] (successful fetches only)
+releases_props_cache = {}  # repo -> [[version, url]] (successful fetches only)
 release_list_cache = {}    # repo -> [release dicts] (successful fetches only)
 
 MAX_WORKERS = 10
 
-
-# Rate limiting helper
-def make_api_request(url, headers):
+# Retries of failed, rate limited and 5xx requests, with exponential backoff (in
+# seconds) unless the response says how long to wait
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1
+MAX_BACKOFF = 30
+# Waiting longer than this for a rate limit to reset fails the request instead
+RATE_LIMIT_MAX_WAIT = 900
+# Keep enough budget to pay for every request in flight: one worker per this
+# many remaining requests
+REQUESTS_PER_WORKER = 4
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Conditional request statistics, updated from the worker threads
+http_cache_stats = {'hits': 0, 'misses': 0, 'bytes_saved': 0, 'bytes_downloaded': 0}
+http_cache_lock = threading.Lock()
+
+# (seconds, status, url) of every request sent, including retries
+request_latencies = []
+request_stats = {'retries': 0, 'rate_limit_waits': 0}
+request_stats_lock = threading.Lock()
+
+
+# Limits the number of requests in flight to what the remaining GitHub rate limit
+# budget allows, and holds API requests back until the limit resets once it is spent
+class RequestScheduler:
+    def __init__(self, max_workers):
+        self.ceiling = max_workers
+        self.limit = max_workers
+        self.peak = 0
+        self.in_flight = 0
+        self.remaining = None
+        self.reset = None
+        self.waited_for_reset = None
+        self.condition = threading.Condition()
+
+    def acquire(self, rate_limited):
+        with self.condition:
+            while True:
+                if rate_limited and self.remaining is not None and self.remaining <= 0:
+                    wait = (self.reset or 0) - time.time()
+                    if wait <= 0:
+                        # The limit has reset: the next response tells the new budget
+                        self.remaining = None
+                        self.limit = self.ceiling
+                    elif wait <= RATE_LIMIT_MAX_WAIT:
+                        if self.waited_for_reset != self.reset:
+                            self.waited_for_reset = self.reset
+                            with request_stats_lock:
+                                request_stats['rate_limit_waits'] += 1
+                            print(f"Rate limit budget spent, waiting {int(wait) + 1} seconds for it to reset...")
+                        self.condition.wait(wait)
+                        continue
+                if self.in_flight < self.limit:
+                    break
+                self.condition.wait()
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def update(self, response_headers):
+        remaining = response_headers.get('X-RateLimit-Remaining')
+        if remaining is None or not remaining.isdigit():
+            return
+        with self.condition:
+            self.remaining = int(remaining)
+            self.reset = int(response_headers.get('X-RateLimit-Reset', 0) or 0)
+            self.limit = max(1, min(self.ceiling, self.remaining // REQUESTS_PER_WORKER))
+            self.condition.notify_all()
+
+    # GitHub asks clients that hit its secondary rate limits to send fewer
+    # requests at once
+    def slow_down(self):
+        with self.condition:
+            self.ceiling = max(1, self.ceiling // 2)
+            self.limit = min(self.limit, self.ceiling)
+
+
+scheduler = RequestScheduler(MAX_WORKERS)
+
+
+# Size the concurrency from the current budget. /rate_limit itself isn't counted.
+def probe_rate_limit(headers):
+    if offline:
+        return
     try:
-        response = http_session.get(url, headers=headers, timeout=30)
-        if response.status_code == 429:  # Rate limit exceeded
-            reset_time = int(response.headers.get('X-RateLimit-Reset', 0))
-            current_time = int(time.time())
-            sleep_time = max(reset_time - current_time + 1, 1)
-            print(f"Rate limit exceeded. Waiting for {sleep_time} seconds...")
-            time.sleep(sleep_time)
-            return make_api_request(url, headers)  # Retry after waiting
-        return response
+        response = http_session.get(f"{api_base_url}/rate_limit", headers=headers, timeout=30)
     except Exception as e:
-        # Avoid flooding logs with traceback for common connection issues
-        print(f"Error making API request to {url}: {e}")
+        print(f"Could not read the rate limit: {e}")
+        return
+    scheduler.update(response.headers)
+    if scheduler.remaining is not None:
+        print(f"Rate limit: {scheduler.remaining} of {response.headers.get('X-RateLimit-Limit', '?')} "
+              f"requests remaining, {scheduler.limit} concurrent requests")
+
+
+def is_rate_limited(response):
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and (
+        response.headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in response.headers)
+
+
+# Seconds to wait before retrying after a failed attempt (response is None for
+# connection errors)
+def retry_delay(response, attempt):
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return int(retry_after)
+        if response.headers.get('X-RateLimit-Remaining') == '0':
+            reset_time = int(response.headers.get('X-RateLimit-Reset', 0) or 0)
+            return max(reset_time - time.time(), 0) + 1
+    # Full jitter keeps workers that failed together from retrying together
+    return random.uniform(0, min(MAX_BACKOFF, BACKOFF_BASE * 2 ** attempt))
+
+
+# Rate limiting helper: retries failed, rate limited and 5xx requests with bounded
+# backoff. Returns the last response, or None if no response was received.
+def make_api_request(url, headers):
+    rate_limited = url.startswith(api_base_url)
+    response = None
+    for attempt in range(MAX_ATTEMPTS):
+        scheduler.acquire(rate_limited)
+        start = time.perf_counter()
+        try:
+            response = http_session.get(url, headers=headers, timeout=30)
+        except Exception as e:
+            # Avoid flooding logs with traceback for common connection issues
+            print(f"Error making API request to {url}: {e}")
+            response = None
+        finally:
+            scheduler.release()
+        status = response.status_code if response is not None else None
+        request_latencies.append((time.perf_counter() - start, status, url))
+
+        if response is not None:
+            scheduler.update(response.headers)
+            rate_limit_hit = is_rate_limited(response)
+            if not rate_limit_hit and response.status_code not in RETRY_STATUS_CODES:
+                return response
+            if rate_limit_hit and response.headers.get('X-RateLimit-Remaining') != '0':
+                scheduler.slow_down()
+        if attempt + 1 == MAX_ATTEMPTS:
+            break
+        delay = retry_delay(response, attempt)
+        if delay > RATE_LIMIT_MAX_WAIT:
+            print(f"Rate limit exceeded for {url} and resets in {int(delay)} seconds, giving up")
+            break
+        print(f"Request to {url} failed ({status or 'no response'}), retrying in {delay:.1f} seconds...")
+        with request_stats_lock:
+            request_stats['retries'] += 1
+        time.sleep(delay)
+    return response
+
+
+def print_request_summary():
+    if not request_latencies:
+        return
+    latencies = sorted(latency for latency, _, _ in request_latencies)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(f"Requests: {len(latencies)} ({request_stats['retries']} retries, "
+          f"{request_stats['rate_limit_waits']} waits for the rate limit to reset, "
+          f"up to {scheduler.peak} concurrent)")
+    print(f"Request latency: p50 {percentile(0.5):.0f} ms, p95 {percentile(0.95):.0f} ms, "
+          f"max {latencies[-1] * 1000:.0f} ms")
+    for latency, status, url in sorted(request_latencies, reverse=True, key=lambda r: r[0])[:5]:
+        print(f"  {latency * 1000:.0f} ms {status} {url}")
+    if scheduler.remaining is not None:
+        print(f"Rate limit remaining: {scheduler.remaining}")
+
+
+# On-disk cache entry for a URL: {format, url, etag, last_modified, size, data}
+def http_cache_path(url):
+    return os.path.join(http_cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+
+def load_http_cache_entry(url):
+    try:
+        with open(http_cache_path(url)) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Guard against hash collisions and entries from older formats
+    if not isinstance(entry, dict) or entry.get('url') != url or entry.get('format') != HTTP_CACHE_FORMAT:
+        return None
+    return entry
+
+
+def store_http_cache_entry(url, entry):
+    path = http_cache_path(url)
+    try:
+        os.makedirs(http_cache_dir, exist_ok=True)
+        # Write to a temporary file first so an interrupted run never leaves a partial entry
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write HTTP cache entry for {url}: {e}")
+
+
+# GET a URL with a conditional request, returning parse(response) for a 200 and the
+# previously parsed data for a 304 (which GitHub doesn't count against the rate
+# limit). Returns None if the request fails.
+def cached_get(url, headers, parse):
+    entry = load_http_cache_entry(url)
+    if offline:
+        if entry is None:
+            return None
+        with http_cache_lock:
+            http_cache_stats['hits'] += 1
+            http_cache_stats['bytes_saved'] += entry.get('size', 0)
+        return entry['data']
+
+    request_headers = dict(headers)
+    if entry:
+        if entry.get('etag'):
+            request_headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            request_headers['If-Modified-Since'] = entry['last_modified']
+
+    response = make_api_request(url, request_headers)
+    if response is None:
+        return None
+    if response.status_code == 304 and entry:
+        with http_cache_lock:
+            http_cache_stats['hits'] += 1
+            http_cache_stats['bytes_saved'] += entry.get('size', 0)
+        return entry['data']
+    if response.status_code != 200:
         return None
 
+    data = parse(response)
+    with http_cache_lock:
+        http_cache_stats['misses'] += 1
+        http_cache_stats['bytes_downloaded'] += len(response.content)
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if etag or last_modified:
+        store_http_cache_entry(url, {
+            'format': HTTP_CACHE_FORMAT,
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'size': len(response.content),
+            'data': data,
+        })
+    return data
+
 
 # Helper function to normalize version strings for comparison
 def normalize_version(version_str):
@@ -238,6 +495,26 @@ def extract_date_from_asset(asset_name, asset_url, created_at):
         return datetime.now()
 
 
+# Number of the last page in a Link header, or None if there isn't one
+def parse_last_page(link_header):
+    match = re.search(r'<[^>]*[?&]page=(\d+)[^>]*>;\s*rel="last"', link_header or '')
+    return int(match.group(1)) if match else None
+
+
+# Fetch one page of releases: {'releases': [...], 'last_page': N or None}, or None
+def fetch_releases_page(owner, repo, page, headers):
+    url = f"{api_base_url}/repos/{owner}/{repo}/releases?per_page=100&page={page}"
+    return cached_get(url, headers, lambda response: {
+        'releases': response.json(),
+        'last_page': parse_last_page(response.headers.get('Link')),
+    })
+
+
+# Pages after the first of a repo's releases are fetched together on this pool.
+# It is separate from the per-repo pool, whose workers wait for these pages.
+page_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+
 # Fetch the full (paginated) list of releases for a repo, cached per run.
 # Returns None if the first request fails, otherwise the list of releases.
 def fetch_all_releases(owner, repo, headers, max_pages=50):
@@ -245,22 +522,36 @@ def fetch_all_releases(owner, repo, headers, max_pages=50):
     if cache_key in release_list_cache:
         return release_list_cache[cache_key]
 
+    first_page = fetch_releases_page(owner, repo, 1, headers)
+    if first_page is None:
+        return None
+    pages = [first_page]
+    # The Link header of the first page names the last one, so the others can be
+    # requested at once instead of one after another
+    last_page = min(first_page['last_page'] or 1, max_pages)
+    if len(first_page['releases']) == 100 and last_page > 1:
+        pages.extend(page_executor.map(
+            lambda page: fetch_releases_page(owner, repo, page, headers), range(2, last_page + 1)))
+
     all_releases = []
-    page = 1
-    while page <= max_pages:
-        url = f"https://api.github.com/repos/{owner}/{repo}/releases?per_page=100&page={page}"
-        response = make_api_request(url, headers)
-        if response is None or response.status_code != 200:
-            if page == 1:
-                return None
-            break
-        page_releases = response.json()
-        if not page_releases:
-            break
-        all_releases.extend(page_releases)
-        if len(page_releases) < 100:
+    page = 0
+    for page_data in pages:
+        if page_data is None:
             break
         page += 1
+        all_releases.extend(page_data['releases'])
+        if len(page_data['releases']) < 100:
+            break
+    else:
+        # Without a Link header (or if releases were added meanwhile), walk on
+        while page < max_pages:
+            page += 1
+            page_data = fetch_releases_page(owner, repo, page, headers)
+            if page_data is None or not page_data['releases']:
+                break
+            all_releases.extend(page_data['releases'])
+            if len(page_data['releases']) < 100:
+                break
 
     release_list_cache[cache_key] = all_releases
     return all_releases
@@ -278,20 +569,11 @@ def build_tag_map(owner, repo, headers):
     }
 
 
-# Fetch and parse releases.properties, cached per run (successful fetches only)
-def fetch_releases_properties(owner, repo, headers):
-    cache_key = f"{owner}/{repo}"
-    if cache_key in releases_props_cache:
-        return releases_props_cache[cache_key]
-
-    releases_props_url = f"https://raw.githubusercontent.com/{owner}/{repo}/main/releases.properties"
-    response = make_api_request(releases_props_url, headers)
-    if response is None or response.status_code != 200:
-        return None
-
-    # Parse releases.properties robustly: support both [version] = url and version = url
+# Parse releases.properties robustly: support both [version] = url and version = url.
+# Returns a list of [version, url] pairs.
+def parse_releases_properties(text):
     matches = []
-    for line in response.text.splitlines():
+    for line in text.splitlines():
         line = line.strip()
         if not line or line.startswith('#') or line.startswith(';'):
             continue
@@ -305,7 +587,20 @@ def fetch_releases_properties(owner, repo, headers):
         left, right = line.split('=', 1)
         version_key = left.strip().strip('[]').strip()
         url_value = right.strip()
-        matches.append((version_key, url_value))
+        matches.append([version_key, url_value])
+    return matches
+
+
+# Fetch and parse releases.properties, cached per run (successful fetches only)
+def fetch_releases_properties(owner, repo, headers):
+    cache_key = f"{owner}/{repo}"
+    if cache_key in releases_props_cache:
+        return releases_props_cache[cache_key]
+
+    releases_props_url = f"{raw_base_url}/{owner}/{repo}/main/releases.properties"
+    matches = cached_get(releases_props_url, headers, lambda response: parse_releases_properties(response.text))
+    if matches is None:
+        return None
 
     releases_props_cache[cache_key] = matches
     return matches
@@ -434,139 +729,251 @@ def process_repo(repo_path):
     return {'module': module_name, 'versions': version_data}, len(version_data), None
 
 
-try:
-    print("Starting release processing...")
+# The combined file has always been written by json.dump(data, f, indent=2); keep
+# its bytes identical so digests only change with the data
+def serialize_json(data):
+    return json.dumps(data, indent=2).encode('utf-8')
 
-    # Fetch and process all repositories in parallel (well within rate limits)
-    results = {}
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = {executor.submit(process_repo, repo_path): repo_path for repo_path in repos}
-        for future in as_completed(futures):
-            repo_path = futures[future]
-            try:
-                results[repo_path] = future.result()
-            except Exception as e:
-                print(f"Error processing repo {repo_path}: {e}")
-                traceback.print_exc()
-                results[repo_path] = (None, 0, f"{repo_path} (Error: {str(e)})")
-
-    # Aggregate results in repo order
-    for repo_path in repos:
-        entry, num_versions, error = results[repo_path]
-        if error:
-            stats['failed_repos'].append(error)
-            continue
-        combined_data.append(entry)
-        stats['processed_repos'] += 1
-        stats['total_versions'] += num_versions
-
-    print("Release processing completed")
-    print(f"Summary: Processed {stats['processed_repos']}/{stats['total_repos']} repositories")
-    print(f"Total versions found: {stats['total_versions']}")
-    if stats['failed_repos']:
-        print(f"Failed repositories: {', '.join(stats['failed_repos'])}")
-
-except Exception as e:
-    print(f"Error during release processing: {e}")
-    traceback.print_exc()
-
-
-# Validation step: Override with releases.properties if it has different URLs
-print("\n" + "="*80)
-print("VALIDATING AGAINST releases.properties")
-print("="*80 + "\n")
-
-for module_entry in combined_data:
-    module_name = module_entry['module']
-    # module_name is already in format "module-{shortname}", extract the shortname
-    module_shortname = module_name.replace('module-', '')
-    repo_path = f"Bearsampp/module-{module_shortname}"
-    parts = repo_path.split('/')
-    owner, repo = parts
 
-    print(f"\nProcessing module: {module_name} (repo: {repo})")
-    print(f"  Current versions in JSON: {[v['version'] for v in module_entry['versions']]}")
+def load_json_file(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
-    # releases.properties is already cached from the main loop when it exists
-    matches = fetch_releases_properties(owner, repo, headers)
-    if not matches:
-        # releases.properties doesn't exist for this module, skip silently
-        continue
-
-    print(f"  Parsed {len(matches)} version entries from releases.properties")
-
-    # Build a map of version -> URL from releases.properties
-    releases_props_map = {}
-    for version_str, url_value in matches:
-        releases_props_map[version_str.strip()] = url_value.strip()
-
-    # Reuse the cached release list for any prerelease lookups below
-    tag_map = build_tag_map(owner, repo, headers)
-
-    print(f"JSON has {len(module_entry['versions'])} versions")
-
-    # Check each version in our combined_data
-    for version_entry in module_entry['versions']:
-        version_num = version_entry['version']
-        current_url = version_entry['url']
-
-        # If releases.properties has a different URL for this version, use it
-        if version_num in releases_props_map:
-            releases_props_url_for_version = releases_props_map[version_num]
-            if current_url != releases_props_url_for_version:
-                print(f"  {version_num}: Updating URL from GitHub API to releases.properties version")
-                print(f"    Old: {current_url}")
-                print(f"    New: {releases_props_url_for_version}")
-                version_entry['url'] = releases_props_url_for_version
-
-                # Get the correct prerelease status for the new URL
-                tag_match = re.search(r'/releases/download/([^/]+)/', releases_props_url_for_version)
-                if tag_match:
-                    tag_info = tag_map.get(tag_match.group(1))
-                    if tag_info is not None:
-                        version_entry['prerelease'] = tag_info.get('prerelease', False)
-                    else:
-                        print(f"    Could not determine prerelease status, keeping: {version_entry['prerelease']}")
-        else:
-            print(f"    NOT in releases.properties (only in GitHub API)")
-
-print("\n" + "="*80)
-print("VALIDATION COMPLETED - About to write JSON file")
-print("="*80 + "\n")
-
-# Show what's about to be written for mysql module
-for entry in combined_data:
-    if entry['module'] == 'module-mysql':
-        print("MySQL versions before writing:")
-        for v in entry['versions'][:5]:  # Show first 5
-            print(f"  {v['version']}: {v['url'][:70]}... (prerelease: {v['prerelease']})")
-        break
-
-# Write the file
-print(f"\nWriting output to {output_path}")
-try:
-    # Ensure output directory exists
-    outdir = os.path.dirname(output_path)
+
+# Write content to path unless it already holds exactly that. Returns whether
+# the file was written.
+def write_if_changed(path, content):
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    outdir = os.path.dirname(path)
     if outdir:
         os.makedirs(outdir, exist_ok=True)
-    with open(output_path, 'w') as f:
-        json.dump(combined_data, f, indent=2)
-    print(f"Successfully saved combined release data to {output_path}")
-    print(f"File size: {os.path.getsize(output_path)} bytes")
-except Exception as e:
-    print(f"Error writing to {output_path}: {e}")
-    traceback.print_exc()
-    # Create an empty file if writing fails
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return True
+
+
+# Manifest of the combined file: its digest and, per module in file order, the
+# digest of the module's entry as it is (or would be) written to its shard
+def build_manifest(modules_data, combined_content):
+    modules = {}
+    for entry in modules_data:
+        shard_content = serialize_json(entry)
+        modules[entry['module']] = {
+            'sha256': hashlib.sha256(shard_content).hexdigest(),
+            'size': len(shard_content),
+            'versions': len(entry['versions']),
+        }
+        if write_shards:
+            modules[entry['module']]['shard'] = f"{os.path.basename(shards_dir)}/{entry['module']}.json"
+    return {
+        'format': MANIFEST_FORMAT,
+        'file': os.path.basename(output_path),
+        'sha256': hashlib.sha256(combined_content).hexdigest(),
+        'size': len(combined_content),
+        'modules': modules,
+    }
+
+
+# Lines describing the modules added, removed or changed between two manifests
+def manifest_delta(old_manifest, new_manifest):
+    old_modules = {}
+    if isinstance(old_manifest, dict) and isinstance(old_manifest.get('modules'), dict):
+        old_modules = old_manifest['modules']
+    new_modules = new_manifest['modules']
+    lines = []
+    for module, info in new_modules.items():
+        old_info = old_modules.get(module)
+        if old_info is None:
+            lines.append(f"  {module}: added ({info['versions']} versions)")
+        elif old_info.get('sha256') != info['sha256']:
+            lines.append(f"  {module}: changed ({old_info.get('versions', '?')} -> {info['versions']} versions)")
+    for module in old_modules:
+        if module not in new_modules:
+            lines.append(f"  {module}: removed")
+    return lines
+
+
+def main():
+    if headers:
+        print("Using GitHub PAT for authentication")
+    else:
+        print("No GitHub PAT found, using unauthenticated requests")
+
     try:
-        outdir = os.path.dirname(output_path)
-        if outdir:
-            os.makedirs(outdir, exist_ok=True)
-        with open(output_path, 'w') as f:
-            json.dump([], f, indent=2)
-        print(f"Created empty {output_path} due to error")
-    except Exception as e2:
-        print(f"Failed to create {output_path}: {e2}")
+        print("Starting release processing...")
+        probe_rate_limit(headers)
+
+        # Fetch and process all repositories in parallel; the scheduler keeps the
+        # number of requests in flight within the rate limit
+        results = {}
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = {executor.submit(process_repo, repo_path): repo_path for repo_path in repos}
+            for future in as_completed(futures):
+                repo_path = futures[future]
+                try:
+                    results[repo_path] = future.result()
+                except Exception as e:
+                    print(f"Error processing repo {repo_path}: {e}")
+                    traceback.print_exc()
+                    results[repo_path] = (None, 0, f"{repo_path} (Error: {str(e)})")
+
+        # Aggregate results in repo order
+        for repo_path in repos:
+            entry, num_versions, error = results[repo_path]
+            if error:
+                stats['failed_repos'].append(error)
+                continue
+            combined_data.append(entry)
+            stats['processed_repos'] += 1
+            stats['total_versions'] += num_versions
+
+        print("Release processing completed")
+        print(f"Summary: Processed {stats['processed_repos']}/{stats['total_repos']} repositories")
+        print(f"Total versions found: {stats['total_versions']}")
+        if stats['failed_repos']:
+            print(f"Failed repositories: {', '.join(stats['failed_repos'])}")
+        print(f"HTTP cache: {http_cache_stats['hits']} hits "
+              f"({'recorded responses' if offline else '304 Not Modified'}), "
+              f"{http_cache_stats['misses']} misses, "
+              f"{http_cache_stats['bytes_saved']} bytes saved, "
+              f"{http_cache_stats['bytes_downloaded']} bytes downloaded")
+        print_request_summary()
+
+    except Exception as e:
+        print(f"Error during release processing: {e}")
         traceback.print_exc()
-        sys.exit(1)
 
-print("Script completed successfully")
+
+    # Validation step: Override with releases.properties if it has different URLs
+    print("\n" + "="*80)
+    print("VALIDATING AGAINST releases.properties")
+    print("="*80 + "\n")
+
+    for module_entry in combined_data:
+        module_name = module_entry['module']
+        # module_name is already in format "module-{shortname}", extract the shortname
+        module_shortname = module_name.replace('module-', '')
+        repo_path = f"Bearsampp/module-{module_shortname}"
+        parts = repo_path.split('/')
+        owner, repo = parts
+
+        print(f"\nProcessing module: {module_name} (repo: {repo})")
+        print(f"  Current versions in JSON: {[v['version'] for v in module_entry['versions']]}")
+
+        # releases.properties is already cached from the main loop when it exists
+        matches = fetch_releases_properties(owner, repo, headers)
+        if not matches:
+            # releases.properties doesn't exist for this module, skip silently
+            continue
+
+        print(f"  Parsed {len(matches)} version entries from releases.properties")
+
+        # Build a map of version -> URL from releases.properties
+        releases_props_map = {}
+        for version_str, url_value in matches:
+            releases_props_map[version_str.strip()] = url_value.strip()
+
+        # Reuse the cached release list for any prerelease lookups below
+        tag_map = build_tag_map(owner, repo, headers)
+
+        print(f"JSON has {len(module_entry['versions'])} versions")
+
+        # Check each version in our combined_data
+        for version_entry in module_entry['versions']:
+            version_num = version_entry['version']
+            current_url = version_entry['url']
+
+            # If releases.properties has a different URL for this version, use it
+            if version_num in releases_props_map:
+                releases_props_url_for_version = releases_props_map[version_num]
+                if current_url != releases_props_url_for_version:
+                    print(f"  {version_num}: Updating URL from GitHub API to releases.properties version")
+                    print(f"    Old: {current_url}")
+                    print(f"    New: {releases_props_url_for_version}")
+                    version_entry['url'] = releases_props_url_for_version
+
+                    # Get the correct prerelease status for the new URL
+                    tag_match = re.search(r'/releases/download/([^/]+)/', releases_props_url_for_version)
+                    if tag_match:
+                        tag_info = tag_map.get(tag_match.group(1))
+                        if tag_info is not None:
+                            version_entry['prerelease'] = tag_info.get('prerelease', False)
+                        else:
+                            print(f"    Could not determine prerelease status, keeping: {version_entry['prerelease']}")
+            else:
+                print(f"    NOT in releases.properties (only in GitHub API)")
+
+    print("\n" + "="*80)
+    print("VALIDATION COMPLETED - About to write JSON file")
+    print("="*80 + "\n")
+
+    # Show what's about to be written for mysql module
+    for entry in combined_data:
+        if entry['module'] == 'module-mysql':
+            print("MySQL versions before writing:")
+            for v in entry['versions'][:5]:  # Show first 5
+                print(f"  {v['version']}: {v['url'][:70]}... (prerelease: {v['prerelease']})")
+            break
+
+    # Write the file, its manifest and the shards, each only if its content changed
+    print(f"\nWriting output to {output_path}")
+    try:
+        combined_content = serialize_json(combined_data)
+        manifest = build_manifest(combined_data, combined_content)
+        previous_manifest = load_json_file(manifest_path)
+
+        if write_shards:
+            for entry in combined_data:
+                write_if_changed(os.path.join(shards_dir, f"{entry['module']}.json"), serialize_json(entry))
+            # Drop the shards of modules that are no longer listed
+            for name in os.listdir(shards_dir) if os.path.isdir(shards_dir) else []:
+                if name.endswith('.json') and name[:-len('.json')] not in manifest['modules']:
+                    os.remove(os.path.join(shards_dir, name))
+
+        if write_if_changed(output_path, combined_content):
+            print(f"Successfully saved combined release data to {output_path}")
+        else:
+            print(f"{output_path} is unchanged (sha256 {manifest['sha256']})")
+        print(f"File size: {os.path.getsize(output_path)} bytes")
+        write_if_changed(manifest_path, serialize_json(manifest))
+
+        delta = manifest_delta(previous_manifest, manifest)
+        if previous_manifest is None:
+            print(f"No previous manifest in {manifest_path}, all modules are new")
+        elif delta:
+            print("Modules changed since the previous manifest:")
+            for line in delta:
+                print(line)
+        else:
+            print("No module changed since the previous manifest")
+    except Exception as e:
+        print(f"Error writing to {output_path}: {e}")
+        traceback.print_exc()
+        # Create an empty file if writing fails
+        try:
+            outdir = os.path.dirname(output_path)
+            if outdir:
+                os.makedirs(outdir, exist_ok=True)
+            with open(output_path, 'w') as f:
+                json.dump([], f, indent=2)
+            print(f"Created empty {output_path} due to error")
+        except Exception as e2:
+            print(f"Failed to create {output_path}: {e2}")
+            traceback.print_exc()
+            sys.exit(1)
+
+    print("Script completed successfully")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# Tests of combine_releases.py against a local stand-in for the GitHub API.
+# Run them with: python -m unittest discover -s .github -p '*_test.py'
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import combine_releases
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'combine_releases.py')
+RESOURCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core', 'resources')
+# Recorded QUICKPICK_HTTP_CACHE entries of module-perl and module-phppgadmin
+# (releases.properties and releases) and of module-ngrok (releases only)
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'quickpick-http')
+
+
+# Run the script in cwd with the given QUICKPICK_* settings, returning its output.
+# server_url points it at a StubServer.
+def run_script(cwd, server_url=None, **settings):
+    env = {name: value for name, value in os.environ.items()
+           if name not in ('GH_PAT', 'GITHUB_API_URL', 'GITHUB_RAW_URL') and not name.startswith('QUICKPICK_')}
+    env.update({f"QUICKPICK_{name.upper()}": value for name, value in settings.items()})
+    if server_url:
+        env.update({'GITHUB_API_URL': server_url, 'GITHUB_RAW_URL': server_url + '/raw'})
+    process = subprocess.run([sys.executable, SCRIPT], cwd=cwd, env=env, stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT, universal_newlines=True, check=False)
+    if process.returncode:
+        raise AssertionError(f"combine_releases.py failed:\n{process.stdout}")
+    return process.stdout
+
+
+def sha256_file(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# (mtime, inode) of every file under directory: write_if_changed replaces the
+# files it writes, so both change when a file is rewritten
+def file_states(directory):
+    states = {}
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            stat = os.stat(os.path.join(dirpath, filename))
+            states[os.path.relpath(os.path.join(dirpath, filename), directory)] = (stat.st_mtime_ns, stat.st_ino)
+    return states
+
+
+# Serves, for each path, the responses queued for it in order, then the last one
+# again, or a 304 when the request's If-None-Match is the response's ETag. Every
+# request is recorded with its headers, and every response status in statuses.
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.responses = {}
+        self.requests = []
+        self.statuses = []
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+
+    # Queue a response for path; body is sent as JSON unless it is bytes. The
+    # request is held for delay seconds before it is answered.
+    def add(self, path, status=200, body=b'', headers=None, delay=0):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.responses.setdefault(path, []).append((status, body, headers or {}, delay))
+
+    def paths(self):
+        return [path for path, _ in self.requests]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers)))
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+            queue = server.responses.get(self.path) or [(404, b'', {}, 0)]
+            status, body, headers, delay = queue.pop(0) if len(queue) > 1 else queue[0]
+            if 'ETag' in headers and self.headers.get('If-None-Match') == headers['ETag']:
+                status, body = 304, b''
+            server.statuses.append((self.path, status))
+        # Not time.sleep, which the tests replace
+        threading.Event().wait(delay)
+        with server.lock:
+            server.in_flight -= 1
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# Points the script at a fresh StubServer, with fresh per-run state. Retries
+# don't wait: the delays they ask for are collected in self.sleeps.
+class StubServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer()
+        self.addCleanup(self.server.stop)
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.sleeps = []
+        self.output = io.StringIO()
+        patchers = [
+            mock.patch.object(combine_releases, 'api_base_url', self.server.url),
+            mock.patch.object(combine_releases, 'raw_base_url', self.server.url + '/raw'),
+            mock.patch.object(combine_releases, 'http_cache_dir', self.cache_dir),
+            mock.patch.object(combine_releases, 'offline', False),
+            mock.patch.object(combine_releases, 'scheduler',
+                              combine_releases.RequestScheduler(combine_releases.MAX_WORKERS)),
+            mock.patch.object(combine_releases, 'release_list_cache', {}),
+            mock.patch.object(combine_releases, 'request_latencies', []),
+            mock.patch.dict(combine_releases.request_stats, {'retries': 0, 'rate_limit_waits': 0}),
+            mock.patch.dict(combine_releases.http_cache_stats,
+                            {'hits': 0, 'misses': 0, 'bytes_saved': 0, 'bytes_downloaded': 0}),
+            mock.patch.object(combine_releases.time, 'sleep', self.sleeps.append),
+            mock.patch('sys.stdout', self.output),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get(self, path):
+        return combine_releases.make_api_request(self.server.url + path, {})
+
+
+class RequestSchedulerTest(unittest.TestCase):
+    def test_update_sizes_limit_from_remaining_budget(self):
+        scheduler = combine_releases.RequestScheduler(10)
+        scheduler.update({'X-RateLimit-Remaining': '12', 'X-RateLimit-Reset': '0'})
+        self.assertEqual(3, scheduler.limit)
+        scheduler.update({'X-RateLimit-Remaining': '4000'})
+        self.assertEqual(10, scheduler.limit)
+        scheduler.update({'X-RateLimit-Remaining': '2'})
+        self.assertEqual(1, scheduler.limit)
+        # Responses without rate limit headers, such as raw downloads, change nothing
+        scheduler.update({})
+        self.assertEqual((2, 1), (scheduler.remaining, scheduler.limit))
+
+    def test_acquire_waits_for_a_free_slot(self):
+        scheduler = combine_releases.RequestScheduler(10)
+        scheduler.update({'X-RateLimit-Remaining': '8'})
+        scheduler.acquire(True)
+        scheduler.acquire(True)
+        waiter = threading.Thread(target=scheduler.acquire, args=(True,))
+        waiter.start()
+        waiter.join(0.2)
+        self.assertTrue(waiter.is_alive())
+        scheduler.release()
+        waiter.join(5)
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(2, scheduler.peak)
+
+    def test_slow_down_halves_the_ceiling(self):
+        scheduler = combine_releases.RequestScheduler(10)
+        scheduler.slow_down()
+        self.assertEqual((5, 5), (scheduler.ceiling, scheduler.limit))
+        scheduler.update({'X-RateLimit-Remaining': '4000'})
+        self.assertEqual(5, scheduler.limit)
+        for _ in range(5):
+            scheduler.slow_down()
+        self.assertEqual((1, 1), (scheduler.ceiling, scheduler.limit))
+
+
+class MakeApiRequestTest(StubServerTestCase):
+    def test_probe_sizes_concurrency_from_the_budget(self):
+        self.server.add('/rate_limit', headers={'X-RateLimit-Remaining': '8', 'X-RateLimit-Limit': '60'})
+        for index in range(6):
+            self.server.add(f"/item/{index}", body={}, headers={'X-RateLimit-Remaining': '8'}, delay=0.1)
+        combine_releases.probe_rate_limit({})
+        self.assertEqual(2, combine_releases.scheduler.limit)
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            responses = list(executor.map(self.get, [f"/item/{index}" for index in range(6)]))
+        self.assertEqual([200] * 6, [response.status_code for response in responses])
+        self.assertEqual(2, self.server.peak)
+        self.assertEqual(2, combine_releases.scheduler.peak)
+
+    def test_429_waits_for_retry_after(self):
+        self.server.add('/item', 429, headers={'Retry-After': '7'})
+        self.server.add('/item', body={'ok': True})
+        response = self.get('/item')
+        self.assertEqual({'ok': True}, response.json())
+        self.assertEqual([7], self.sleeps)
+        self.assertEqual(1, combine_releases.request_stats['retries'])
+
+    def test_secondary_rate_limit_slows_down(self):
+        self.server.add('/item', 403, headers={'Retry-After': '60', 'X-RateLimit-Remaining': '4000'})
+        self.server.add('/item', body={})
+        self.assertEqual(200, self.get('/item').status_code)
+        self.assertEqual([60], self.sleeps)
+        self.assertEqual((5, 5), (combine_releases.scheduler.ceiling, combine_releases.scheduler.limit))
+
+    def test_403_with_spent_budget_waits_for_the_reset(self):
+        reset = int(time.time()) + 2
+        self.server.add('/item', 403, headers={'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(reset)})
+        self.server.add('/item', body={}, headers={'X-RateLimit-Remaining': '59'})
+        self.assertEqual(200, self.get('/item').status_code)
+        # The retry delay covers the reset, and the scheduler holds the request
+        # back until then
+        self.assertEqual(1, len(self.sleeps))
+        self.assertGreater(self.sleeps[0], 1)
+        self.assertGreaterEqual(time.time(), reset)
+        self.assertEqual(1, combine_releases.request_stats['rate_limit_waits'])
+        self.assertEqual(59, combine_releases.scheduler.remaining)
+        # Spending the primary budget isn't a reason to send fewer requests at once
+        self.assertEqual(10, combine_releases.scheduler.ceiling)
+
+    def test_reset_too_far_away_gives_up(self):
+        reset = int(time.time()) + combine_releases.RATE_LIMIT_MAX_WAIT + 60
+        self.server.add('/item', 403, headers={'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(reset)})
+        self.assertEqual(403, self.get('/item').status_code)
+        self.assertEqual(['/item'], self.server.paths())
+        self.assertEqual([], self.sleeps)
+
+    def test_5xx_is_retried_with_backoff(self):
+        self.server.add('/item', 502)
+        self.server.add('/item', 503)
+        self.server.add('/item', body={})
+        self.assertEqual(200, self.get('/item').status_code)
+        self.assertEqual(3, len(self.server.requests))
+        self.assertEqual(2, len(self.sleeps))
+        self.assertLessEqual(self.sleeps[0], combine_releases.BACKOFF_BASE)
+        self.assertLessEqual(self.sleeps[1], combine_releases.BACKOFF_BASE * 2)
+
+    def test_5xx_gives_up_after_max_attempts(self):
+        self.server.add('/item', 500)
+        self.assertEqual(500, self.get('/item').status_code)
+        self.assertEqual(combine_releases.MAX_ATTEMPTS, len(self.server.requests))
+        self.assertEqual(combine_releases.MAX_ATTEMPTS - 1, len(self.sleeps))
+
+
+class FetchAllReleasesTest(StubServerTestCase):
+    def add_page(self, page, first, count, **kwargs):
+        self.server.add(f"/repos/o/r/releases?per_page=100&page={page}",
+                        body=[{'tag_name': f"v{index}"} for index in range(first, first + count)], **kwargs)
+
+    def tags(self):
+        return [release['tag_name'] for release in combine_releases.fetch_all_releases('o', 'r', {})]
+
+    def test_pages_are_fetched_concurrently_in_page_order(self):
+        link = f'<{self.server.url}/repos/o/r/releases?per_page=100&page=4>; rel="last"'
+        self.add_page(1, 0, 100, headers={'Link': link})
+        # The later pages answer first
+        self.add_page(2, 100, 100, delay=0.3)
+        self.add_page(3, 200, 100, delay=0.2)
+        self.add_page(4, 300, 30, delay=0.1)
+        self.assertEqual([f"v{index}" for index in range(330)], self.tags())
+        self.assertEqual(3, self.server.peak)
+        self.assertEqual(4, len(self.server.requests))
+
+    def test_pages_without_link_header_are_walked(self):
+        self.add_page(1, 0, 100)
+        self.add_page(2, 100, 100)
+        self.add_page(3, 200, 0)
+        self.assertEqual([f"v{index}" for index in range(200)], self.tags())
+        self.assertEqual(1, self.server.peak)
+
+    def test_failed_first_page(self):
+        self.assertIsNone(combine_releases.fetch_all_releases('o', 'r', {}))
+
+
+class CachedGetTest(StubServerTestCase):
+    VALIDATORS = {'ETag': '"v1"', 'Last-Modified': 'Sun, 31 May 2026 12:00:00 GMT'}
+
+    def cached_get(self, path, headers=None):
+        self.parsed = []
+
+        def parse(response):
+            self.parsed.append(response)
+            return response.json()
+        return combine_releases.cached_get(self.server.url + path, headers or {}, parse)
+
+    def cache_files(self):
+        return os.listdir(self.cache_dir)
+
+    def test_200_is_stored_with_its_validators(self):
+        self.server.add('/data', body={'a': 1}, headers=self.VALIDATORS)
+        self.assertEqual({'a': 1}, self.cached_get('/data'))
+        entry = combine_releases.load_http_cache_entry(self.server.url + '/data')
+        self.assertEqual({'format': combine_releases.HTTP_CACHE_FORMAT, 'url': self.server.url + '/data',
+                          'etag': '"v1"', 'last_modified': self.VALIDATORS['Last-Modified'],
+                          'size': len(b'{"a": 1}'), 'data': {'a': 1}}, entry)
+        self.assertEqual({'hits': 0, 'misses': 1, 'bytes_saved': 0, 'bytes_downloaded': len(b'{"a": 1}')},
+                         combine_releases.http_cache_stats)
+
+    def test_304_returns_the_cached_data(self):
+        self.server.add('/data', body={'a': 1}, headers=self.VALIDATORS)
+        self.cached_get('/data')
+        self.assertEqual({'a': 1}, self.cached_get('/data', {'Authorization': 'token t'}))
+        self.assertEqual([], self.parsed)
+        self.assertEqual([('/data', 200), ('/data', 304)], self.server.statuses)
+        request_headers = self.server.requests[1][1]
+        self.assertEqual('"v1"', request_headers['If-None-Match'])
+        self.assertEqual(self.VALIDATORS['Last-Modified'], request_headers['If-Modified-Since'])
+        self.assertEqual('token t', request_headers['Authorization'])
+        self.assertNotIn('If-None-Match', self.server.requests[0][1])
+        self.assertEqual({'hits': 1, 'misses': 1, 'bytes_saved': 8, 'bytes_downloaded': 8},
+                         combine_releases.http_cache_stats)
+
+    def test_changed_response_replaces_the_entry(self):
+        self.server.add('/data', body={'a': 1}, headers=self.VALIDATORS)
+        self.server.add('/data', body={'a': 2}, headers={'ETag': '"v2"'})
+        self.cached_get('/data')
+        self.assertEqual({'a': 2}, self.cached_get('/data'))
+        entry = combine_releases.load_http_cache_entry(self.server.url + '/data')
+        self.assertEqual(('"v2"', None, {'a': 2}), (entry['etag'], entry['last_modified'], entry['data']))
+
+    def test_response_without_validators_is_not_stored(self):
+        self.server.add('/data', body={'a': 1})
+        self.assertEqual({'a': 1}, self.cached_get('/data'))
+        self.assertEqual([], self.cache_files())
+
+    def test_failed_request_returns_none(self):
+        self.assertIsNone(self.cached_get('/missing'))
+        self.assertEqual([], self.cache_files())
+
+    def test_entries_of_other_formats_or_urls_are_ignored(self):
+        url = self.server.url + '/data'
+        entry = {'format': combine_releases.HTTP_CACHE_FORMAT, 'url': url, 'etag': '"v1"',
+                 'last_modified': None, 'size': 8, 'data': {'a': 0}}
+        combine_releases.store_http_cache_entry(url, dict(entry, format=combine_releases.HTTP_CACHE_FORMAT - 1))
+        self.assertIsNone(combine_releases.load_http_cache_entry(url))
+        # An entry whose URL differs is another URL's, whatever its file name
+        combine_releases.store_http_cache_entry(url, dict(entry, url=url + '?other'))
+        self.assertIsNone(combine_releases.load_http_cache_entry(url))
+        self.server.add('/data', body={'a': 1}, headers=self.VALIDATORS)
+        self.assertEqual({'a': 1}, self.cached_get('/data'))
+        self.assertNotIn('If-None-Match', self.server.requests[0][1])
+
+    def test_offline_only_reads_the_cache(self):
+        self.server.add('/data', body={'a': 1}, headers=self.VALIDATORS)
+        self.cached_get('/data')
+        with mock.patch.object(combine_releases, 'offline', True):
+            self.assertEqual({'a': 1}, self.cached_get('/data'))
+            self.assertIsNone(self.cached_get('/other'))
+        self.assertEqual(1, len(self.server.requests))
+        self.assertEqual(1, combine_releases.http_cache_stats['hits'])
+
+
+# Serves every module of the committed combined file: its versions from
+# releases.properties and its prerelease flags from the releases list
+class SecondRunTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer()
+        self.addCleanup(self.server.stop)
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.output_path = os.path.join(self.work_dir, 'out', 'quickpick-releases.json')
+        with open(os.path.join(RESOURCES, 'quickpick-releases.json')) as f:
+            modules = json.load(f)
+        validators = {'ETag': '"v1"', 'Last-Modified': 'Sun, 31 May 2026 12:00:00 GMT'}
+        for module in modules:
+            properties = ''.join(f"{entry['version']} = {entry['url']}\n" for entry in module['versions'])
+            self.server.add(f"/raw/Bearsampp/{module['module']}/main/releases.properties",
+                            body=properties.encode('utf-8'), headers={'ETag': '"v1"'})
+            releases = {}
+            for entry in module['versions']:
+                tag = entry['url'].split('/releases/download/')[1].split('/')[0]
+                releases[tag] = {'tag_name': tag, 'prerelease': entry['prerelease'], 'assets': []}
+            self.server.add(f"/repos/Bearsampp/{module['module']}/releases?per_page=100&page=1",
+                            body=list(releases.values()), headers=validators)
+
+    def run_online(self):
+        return run_script(self.work_dir, self.server.url, http_cache='cache', output=self.output_path)
+
+    def test_second_run_only_gets_304s(self):
+        self.run_online()
+        with open(self.output_path, 'rb') as f:
+            first = f.read()
+        requests = len(self.server.statuses)
+        output = self.run_online()
+        statuses = {status for path, status in self.server.statuses[requests:] if path != '/rate_limit'}
+        self.assertEqual({304}, statuses)
+        self.assertIn('HTTP cache: 40 hits (304 Not Modified), 0 misses', output)
+        with open(self.output_path, 'rb') as f:
+            self.assertEqual(first, f.read())
+        with open(os.path.join(RESOURCES, 'quickpick-releases.json'), 'rb') as f:
+            self.assertEqual(f.read(), first)
+
+
+class OfflineRunTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.out_dir = os.path.join(self.work_dir, 'out')
+
+    def run_offline(self, cache_dir=FIXTURES):
+        return run_script(self.work_dir, offline='1', shards='1', http_cache=cache_dir,
+                          output=os.path.join(self.out_dir, 'quickpick-releases.json'))
+
+    def manifest(self):
+        with open(os.path.join(self.out_dir, 'quickpick-manifest.json')) as f:
+            return json.load(f)
+
+    def test_manifest_digests_match_the_written_files(self):
+        output = self.run_offline()
+        self.assertIn('HTTP cache: 5 hits (recorded responses), 0 misses', output)
+        manifest = self.manifest()
+        combined = os.path.join(self.out_dir, 'quickpick-releases.json')
+        self.assertEqual((sha256_file(combined), os.path.getsize(combined)), (manifest['sha256'], manifest['size']))
+        self.assertEqual(['module-ngrok', 'module-perl', 'module-phppgadmin'], list(manifest['modules']))
+        for module, info in manifest['modules'].items():
+            shard = os.path.join(self.out_dir, info['shard'])
+            self.assertEqual(f"quickpick/{module}.json", info['shard'])
+            self.assertEqual((sha256_file(shard), os.path.getsize(shard)), (info['sha256'], info['size']))
+        with open(os.path.join(self.out_dir, 'quickpick', 'module-perl.json')) as f:
+            self.assertEqual(5, len(json.load(f)['versions']))
+
+    def test_second_run_rewrites_nothing(self):
+        self.run_offline()
+        states = file_states(self.out_dir)
+        output = self.run_offline()
+        self.assertEqual(states, file_states(self.out_dir))
+        self.assertIn('No module changed since the previous manifest', output)
+
+    def test_changed_module_is_in_the_delta(self):
+        self.run_offline()
+        states = file_states(self.out_dir)
+        cache_dir = os.path.join(self.work_dir, 'cache')
+        shutil.copytree(FIXTURES, cache_dir)
+        with mock.patch.object(combine_releases, 'http_cache_dir', cache_dir):
+            url = f"{combine_releases.raw_base_url}/Bearsampp/module-perl/main/releases.properties"
+            entry = combine_releases.load_http_cache_entry(url)
+            entry['data'].append(['5.44.0', 'https://github.com/Bearsampp/module-perl/releases/download/'
+                                            '2026.6.1/bearsampp-perl-5.44.0-2026.6.1.7z'])
+            combine_releases.store_http_cache_entry(url, entry)
+        output = self.run_offline(cache_dir)
+        self.assertIn('Modules changed since the previous manifest:\n  module-perl: changed (5 -> 6 versions)\n', output)
+        rewritten = {path for path, state in file_states(self.out_dir).items() if states[path] != state}
+        self.assertEqual({'quickpick-releases.json', 'quickpick-manifest.json', os.path.join('quickpick', 'module-perl.json')},
+                         rewritten)
+
+
+# The files QuickPick::syncWithManifest and updateChangedModules check against
+# the published manifest
+class CommittedManifestTest(unittest.TestCase):
+    def test_committed_manifest_matches_the_committed_files(self):
+        with open(os.path.join(RESOURCES, 'quickpick-manifest.json')) as f:
+            manifest = json.load(f)
+        self.assertEqual(combine_releases.MANIFEST_FORMAT, manifest['format'])
+        combined = os.path.join(RESOURCES, manifest['file'])
+        self.assertEqual(sha256_file(combined), manifest['sha256'])
+        with open(combined) as f:
+            entries = json.load(f)
+        self.assertEqual([entry['module'] for entry in entries], list(manifest['modules']))
+        for entry, info in zip(entries, manifest['modules'].values()):
+            shard = os.path.join(RESOURCES, info['shard'])
+            self.assertEqual(sha256_file(shard), info['sha256'])
+            with open(shard) as f:
+                self.assertEqual(entry, json.load(f))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -64,12 +64,20 @@ class QuickPick
     private $jsonFilePath;
 
     /**
-     * Constructor to initialize the jsonFilePath.
+     * @var string $manifestFilePath
+     *
+     * The file path to the local quickpick-manifest.json file, which describes the local quickpick-releases.json.
+     */
+    private $manifestFilePath;
+
+    /**
+     * Constructor to initialize the jsonFilePath and manifestFilePath.
      */
     public function __construct()
     {
         global $bearsamppCore;
         $this->jsonFilePath = Path::getResourcesPath() . '/quickpick-releases.json';
+        $this->manifestFilePath = Path::getResourcesPath() . '/quickpick-manifest.json';
     }
 
     /**
@@ -153,11 +161,12 @@ class QuickPick
     /**
      * Checks if the local `quickpick-releases.json` file is up-to-date with the remote version.
      *
-     * Compares the creation time of the local JSON file with the remote file's last modified time.
-     * If the remote file is newer or the local file does not exist, it fetches the latest JSON data by calling
-     * the `rebuildQuickpickJson` method.
+     * Fetches the remote manifest, which holds a digest of the file and of each module, and compares it with the local
+     * one. If they differ, only the modules that changed are fetched from their shards, or the whole file when that
+     * is not possible. Without a remote manifest, compares the creation time of the local JSON file with the remote
+     * file's last modified time instead, and fetches the whole file if the remote one is newer.
      *
-     * @return array|false Returns the JSON data if the remote file is newer or the local file does not exist,
+     * @return array|false Returns the result of the update if the local file was updated or did not exist,
      *                     otherwise returns false.
      * @throws Exception
      */
@@ -165,6 +174,11 @@ class QuickPick
     {
         global $bearsamppConfig;
 
+        $remoteManifest = $this->fetchRemoteManifest();
+        if ($remoteManifest !== null) {
+            return $this->syncWithManifest($remoteManifest);
+        }
+
         // Determine local file creation time or rebuild if missing
         $localFileCreationTime = $this->getLocalFileCreationTime();
 
@@ -186,6 +200,161 @@ class QuickPick
         return false;
     }
 
+    /**
+     * Fetches and decodes the remote manifest.
+     *
+     * @return array|null The manifest, or null if it cannot be fetched or is not valid.
+     */
+    private function fetchRemoteManifest(): ?array
+    {
+        $content = @file_get_contents(QUICKPICK_MANIFEST_URL, false, HttpClient::getSslStreamContext());
+        if ($content === false) {
+            Log::debug('Could not fetch ' . QUICKPICK_MANIFEST_URL);
+            return null;
+        }
+
+        $manifest = json_decode($content, true);
+        return $this->isValidManifest($manifest) ? $manifest : null;
+    }
+
+    /**
+     * Reads the manifest that describes the local JSON file.
+     *
+     * @return array|null The manifest, or null if it does not exist or is not valid.
+     */
+    private function getLocalManifest(): ?array
+    {
+        if (!file_exists($this->manifestFilePath)) {
+            return null;
+        }
+
+        $manifest = json_decode(@file_get_contents($this->manifestFilePath), true);
+        return $this->isValidManifest($manifest) ? $manifest : null;
+    }
+
+    /**
+     * Determines whether decoded JSON is a manifest in a format this class understands.
+     *
+     * @param mixed $manifest The decoded manifest.
+     * @return bool True if the manifest can be used, false otherwise.
+     */
+    private function isValidManifest($manifest): bool
+    {
+        return is_array($manifest)
+            && ($manifest['format'] ?? null) === 1
+            && is_string($manifest['sha256'] ?? null)
+            && is_array($manifest['modules'] ?? null);
+    }
+
+    /**
+     * Brings the local JSON file up to date with the remote manifest, then saves the manifest locally.
+     *
+     * @param array $remoteManifest The remote manifest.
+     * @return array|false The result of the update, or false if the local file was already up-to-date.
+     * @throws Exception If the JSON content cannot be fetched or saved.
+     */
+    private function syncWithManifest(array $remoteManifest)
+    {
+        $localManifest = $this->getLocalManifest();
+        $hasLocalFile = file_exists($this->jsonFilePath);
+        if ($hasLocalFile && $localManifest !== null && $localManifest['sha256'] === $remoteManifest['sha256']) {
+            return false;
+        }
+
+        $result = false;
+        if ($hasLocalFile && $localManifest !== null) {
+            $result = $this->updateChangedModules($localManifest, $remoteManifest);
+        }
+        if ($result === false) {
+            $result = $this->rebuildQuickpickJson();
+            // The file and the manifest can disagree for a while after they are published; check again next time
+            if (hash_file('sha256', $this->jsonFilePath) !== $remoteManifest['sha256']) {
+                Log::debug('Fetched JSON file does not match the remote manifest yet');
+                return $result;
+            }
+        }
+
+        if (file_put_contents($this->manifestFilePath, json_encode($remoteManifest, JSON_PRETTY_PRINT | JSON_UNESCAPED_SLASHES)) === false) {
+            Log::error('Failed to save the QuickPick manifest: ' . $this->manifestFilePath);
+        }
+
+        return $result;
+    }
+
+    /**
+     * Updates the modules that differ between the local and the remote manifest from their shards.
+     *
+     * Each shard is checked against its digest in the remote manifest. The local file is only rewritten once every
+     * changed module has been fetched.
+     *
+     * @param array $localManifest The manifest describing the local JSON file.
+     * @param array $remoteManifest The remote manifest.
+     * @return array|false The result of the update, or false if the whole file should be fetched instead.
+     * @throws Exception If the JSON content cannot be saved.
+     */
+    private function updateChangedModules(array $localManifest, array $remoteManifest)
+    {
+        $changed = [];
+        $changedSize = 0;
+        foreach ($remoteManifest['modules'] as $module => $info) {
+            $localInfo = $localManifest['modules'][$module] ?? null;
+            if ($localInfo !== null && ($localInfo['sha256'] ?? null) === ($info['sha256'] ?? null)) {
+                continue;
+            }
+            if (empty($info['shard']) || empty($info['sha256'])) {
+                return false;
+            }
+            $changed[$module] = $info;
+            $changedSize += $info['size'] ?? 0;
+        }
+
+        // Fetching the shards only pays off when they are smaller than the whole file
+        if (isset($remoteManifest['size']) && $changedSize >= $remoteManifest['size']) {
+            return false;
+        }
+
+        $data = $this->getQuickpickJson();
+        if (isset($data['error'])) {
+            return false;
+        }
+        $entries = [];
+        foreach ($data as $entry) {
+            if (isset($entry['module'])) {
+                $entries[$entry['module']] = $entry;
+            }
+        }
+
+        $baseUrl = dirname(QUICKPICK_MANIFEST_URL);
+        foreach ($changed as $module => $info) {
+            $content = @file_get_contents($baseUrl . '/' . $info['shard'], false, HttpClient::getSslStreamContext());
+            if ($content === false || hash('sha256', $content) !== $info['sha256']) {
+                Log::debug('Could not fetch a matching shard for ' . $module);
+                return false;
+            }
+            $entry = json_decode($content, true);
+            if (!is_array($entry)) {
+                return false;
+            }
+            $entries[$module] = $entry;
+        }
+
+        // Keep the modules of the remote file, in its order
+        $updated = [];
+        foreach (array_keys($remoteManifest['modules']) as $module) {
+            if (!isset($entries[$module])) {
+                return false;
+            }
+            $updated[] = $entries[$module];
+        }
+
+        if (file_put_contents($this->jsonFilePath, json_encode($updated, JSON_PRETTY_PRINT | JSON_UNESCAPED_SLASHES)) === false) {
+            throw new Exception('Failed to save JSON content to the specified path.');
+        }
+
+        Log::debug('Updated QuickPick modules from their shards: ' . implode(', ', array_keys($changed)));
+        return ['success' => 'JSON content of ' . count($changed) . ' changed modules fetched and saved successfully'];
+    }
+
     /**
      * Returns the local file's creation time, or triggers and returns 0 if file does not exist.
      *
@@ -280,6 +449,11 @@ class QuickPick
             throw new Exception( 'Failed to save JSON content to the specified path.' );
         }
 
+        // The local manifest no longer describes the file; callers that know the new manifest save it again
+        if ( file_exists( $this->manifestFilePath ) ) {
+            @unlink( $this->manifestFilePath );
+        }
+
         // Return success message
         return ['success' => 'JSON content fetched and saved successfully'];
     }
@@ -25,6 +25,8 @@ const QUICKPICK_API_URL = 'https://bearsampp.com/index.php?option=com_osmembersh
 
 // URL where quickpick-releases.json lives
 const QUICKPICK_JSON_URL = 'https://raw.githubusercontent.com/' . APP_GITHUB_USER . '/' . APP_GITHUB_REPO . '/main/core/resources/quickpick-releases.json';
+// Digests of quickpick-releases.json and of its per-module shards, which live next to it
+const QUICKPICK_MANIFEST_URL = 'https://raw.githubusercontent.com/' . APP_GITHUB_USER . '/' . APP_GITHUB_REPO . '/main/core/resources/quickpick-manifest.json';
 
 // CRITICAL: Check for elevation IMMEDIATELY - must be FAST to minimize console window visibility
 if (isset($_SERVER['argv']) && isset($_SERVER['argv'][1]) && $_SERVER['argv'][1] === 'startup') {